@@ -14,12 +14,14 @@
 
 from datetime import datetime
 import enum
+from functools import lru_cache
 import hashlib
 import importlib
 import os
-from typing import Optional
+import time
+from typing import Any, Dict, Optional, Tuple
 from typing_extensions import Self
-from dataclasses import dataclass
+from dataclasses import astuple, dataclass
 import sgx_dcap_quote_verify
 from sgx_dcap_quote_verify import VerificationStatus
 import toml
@@ -105,6 +107,70 @@ class IdentityError(QuoteValidationError):
         )
 
 
+# The verification checks the collateral against the current date, hence the
+# results are only kept for a short time.
+QUOTE_VERIFICATION_CACHE_TTL = 60
+
+_quote_verification_cache: Dict[Tuple[bytes, tuple], Tuple[float, Any]] = {}
+
+
+@lru_cache(maxsize=None)
+def _trusted_root_ca_certificate() -> str:
+    """Read the Intel SGX Provisioning Certification Root CA bundled with the package."""
+    return importlib.resources.read_text(  # type: ignore
+        __package__, "Intel_SGX_Provisioning_Certification_RootCA.pem"
+    )
+
+
+@lru_cache(maxsize=None)
+def _default_manifest() -> "EnclaveManifest":
+    """Load the manifest.toml bundled with the package."""
+    return EnclaveManifest.from_str(
+        importlib.resources.read_text(__package__, "manifest.toml")  # type: ignore
+    )
+
+
+@lru_cache(maxsize=8)
+def _load_manifest(path: Path, mtime_ns: int) -> "EnclaveManifest":
+    """Load a manifest from a file, parsed once per path and modification time."""
+    return EnclaveManifest.from_str(path.read_text())
+
+
+def _verify_quote(quote: bytes, collateral: Collateral):
+    """Verify the quote and its collateral with the SGX Quote Verification Library.
+
+    Results are reused for QUOTE_VERIFICATION_CACHE_TTL seconds, so that reconnecting
+    to the same enclave does not run the whole DCAP verification again.
+    """
+    key = (quote, astuple(collateral))
+    now = time.monotonic()
+
+    cached = _quote_verification_cache.get(key)
+    if cached is not None and now - cached[0] < QUOTE_VERIFICATION_CACHE_TTL:
+        return cached[1]
+
+    attestation_result = sgx_dcap_quote_verify.verify(
+        trusted_root_ca_certificate=_trusted_root_ca_certificate(),
+        pck_certificate=collateral.pck_certificate,
+        pck_signing_chain=collateral.pck_signing_chain,
+        root_ca_crl=collateral.root_ca_crl,
+        intermediate_ca_crl=collateral.pck_crl,
+        tcb_info=collateral.tcb_info,
+        tcb_signing_chain=collateral.tcb_info_issuer_chain,
+        quote=quote,
+        qe_identity=collateral.qe_identity,
+        expiration_date=datetime.now(),
+    )
+
+    # Drop expired entries so that the cache does not grow with every new quote
+    for k, (verified_at, _) in list(_quote_verification_cache.items()):
+        if now - verified_at >= QUOTE_VERIFICATION_CACHE_TTL:
+            _quote_verification_cache.pop(k, None)
+    _quote_verification_cache[key] = (now, attestation_result)
+
+    return attestation_result
+
+
 def validate_attestation(
     quote: bytes,
     collateral: Collateral,
@@ -134,22 +200,7 @@ def validate_attestation(
     # TODO: Handle the case where the retuned quote status is STATUS_TCB_SW_HARDENING_NEEDED
     # We must do more cautious checks in this case in order to determine whether or not to accept the quote
 
-    trusted_root_ca_certificate = importlib.resources.read_text(  # type: ignore
-        __package__, "Intel_SGX_Provisioning_Certification_RootCA.pem"
-    )
-
-    attestation_result = sgx_dcap_quote_verify.verify(
-        trusted_root_ca_certificate=trusted_root_ca_certificate,
-        pck_certificate=collateral.pck_certificate,
-        pck_signing_chain=collateral.pck_signing_chain,
-        root_ca_crl=collateral.root_ca_crl,
-        intermediate_ca_crl=collateral.pck_crl,
-        tcb_info=collateral.tcb_info,
-        tcb_signing_chain=collateral.tcb_info_issuer_chain,
-        quote=quote,
-        qe_identity=collateral.qe_identity,
-        expiration_date=datetime.now(),
-    )
+    attestation_result = _verify_quote(quote, collateral)
     if attestation_result.pck_certificate_status != VerificationStatus.STATUS_OK:
         raise QuoteValidationError(
             f"Invalid PCK certificate status {attestation_result.pck_certificate_status.name}"
@@ -184,13 +235,14 @@ def validate_attestation(
         )
 
     if manifest_path is None:
-        manifest = EnclaveManifest.from_str(
-            importlib.resources.read_text(__package__, "manifest.toml")  # type: ignore
-        )
+        manifest = _default_manifest()
     else:
         if not isinstance(manifest_path, Path):
             raise ValueError("manifest_path should be a pathlib.Path")
-        manifest = EnclaveManifest.from_str(manifest_path.read_text())
+        # The modification time is part of the key so that an edited manifest is reloaded
+        manifest = _load_manifest(
+            manifest_path.resolve(), manifest_path.stat().st_mtime_ns
+        )
 
     if attestation_result.enclave_report.mr_enclave != manifest.mr_enclave:
         raise IdentityError(
@@ -1,10 +1,15 @@
-import whisper
-from typing import Optional, Union
+from functools import lru_cache
+import threading
+from typing import TYPE_CHECKING, Optional, Union
+import requests
 from .utils import fetch_whisper_tiny_20_tokens
 from .client import BlindAiConnection, connect
-from transformers import WhisperProcessor
-import torch
-from ._preprocess_audio import load_audio
+
+# whisper, transformers and torch are heavy, they are only imported when the
+# audio API is actually used so that `import blindai` stays cheap.
+if TYPE_CHECKING:
+    import torch
+    from transformers import WhisperProcessor
 
 DEFAULT_BLINDAI_ADDR = "4.246.205.63"
 DEFAULT_WHISPER_MODEL = "tiny.en"
@@ -13,8 +18,11 @@ DEFAULT_TEE = "sgx"
 DEFAULT_TRANSFORMER = f"openai/whisper-{DEFAULT_WHISPER_MODEL}"
 DEFAULT_MODEL_HASH = "ff63656d9b09514efbb38b4b69324280a86b55df5e3a2268cb79e812d8c7b863"
 
+_default_connection: Optional[BlindAiConnection] = None
+_default_connection_lock = threading.Lock()
+
 
-def _preprocess_audio(file: Union[str, bytes]) -> torch.Tensor:
+def _preprocess_audio(file: Union[str, bytes]) -> "torch.Tensor":
     """
     Preprocess audio file to be used with Whisper model.
 
@@ -26,6 +34,9 @@ def _preprocess_audio(file: Union[str, bytes]) -> torch.Tensor:
         torch.Tensor:
             The preprocessed audio file
     """
+    import whisper
+    from ._preprocess_audio import load_audio
+
     # Load audio file
     audio = load_audio(file).flatten()
 
@@ -42,6 +53,9 @@ def _get_connection(
     """
     Get the BlindAI connection object.
 
+    The connection to the default server is established (and attested) once, then
+    reused by the following calls.
+
     Args:
         connection: Optional[BlindAiConnection]
             The BlindAI connection object
@@ -50,15 +64,59 @@ def _get_connection(
         BlindAiConnection:
             The BlindAI connection object
     """
+    global _default_connection
+
     if connection is None:
-        connection = connect(
-            DEFAULT_BLINDAI_ADDR,
-            hazmat_http_on_unattested_port=True,
-        )
+        # The lock makes sure concurrent first calls attest only one connection
+        with _default_connection_lock:
+            if _default_connection is None:
+                _default_connection = connect(
+                    DEFAULT_BLINDAI_ADDR,
+                    hazmat_http_on_unattested_port=True,
+                )
+            connection = _default_connection
 
     return connection
 
 
+def _discard_default_connection(connection: "BlindAiConnection"):
+    """
+    Close the default connection and forget it, so that the next call reconnects.
+
+    Nothing is done if the default connection was already replaced by another call.
+
+    Args:
+        connection: BlindAiConnection
+            The default connection that failed
+    """
+    global _default_connection
+
+    with _default_connection_lock:
+        if _default_connection is connection:
+            _default_connection = None
+            connection.close()
+
+
+@lru_cache(maxsize=None)
+def _get_processor(transformer: str) -> "WhisperProcessor":
+    """
+    Load the Whisper processor used to decode the tokens.
+
+    It is loaded once per transformer and reused by the following calls.
+
+    Args:
+        transformer: str
+            The name of the pretrained Whisper transformer
+
+    Returns:
+        WhisperProcessor:
+            The Whisper processor
+    """
+    from transformers import WhisperProcessor
+
+    return WhisperProcessor.from_pretrained(transformer)
+
+
 class Audio:
     @classmethod
     def transcribe(
@@ -93,21 +151,33 @@ class Audio:
         # Preprocess audio file
         input_mel = _preprocess_audio(file)
 
-        # Get BlindAI connection object
-        with _get_connection(connection, tee) as conn:
-            # Run ONNX model with `input_array` on BlindAI server
+        # Get BlindAI connection object. It is not closed here: either the caller owns
+        # it, or it is the default connection which is kept for the next calls.
+        conn = _get_connection(connection, tee)
+
+        # Run ONNX model with `input_array` on BlindAI server
+        try:
+            res = conn.run_model(model_hash=DEFAULT_MODEL_HASH, input_tensors=input_mel)
+        except requests.exceptions.ConnectionError:
+            if connection is not None:
+                raise
+            # The default connection is broken or the server restarted with a new
+            # certificate (SSLError is a ConnectionError): attest a new connection and
+            # retry once. Errors returned by the server are raised as is.
+            _discard_default_connection(conn)
+            conn = _get_connection(None, tee)
             res = conn.run_model(model_hash=DEFAULT_MODEL_HASH, input_tensors=input_mel)
 
-            # Convert each output BlindAI Tensor object into PyTorch Tensor
-            res = [t.as_torch() for t in res.output]  # type: ignore
+        # Convert each output BlindAI Tensor object into PyTorch Tensor
+        res = [t.as_torch() for t in res.output]  # type: ignore
 
-            # Load the Whisper Transformer object.
-            tokenizer = WhisperProcessor.from_pretrained(DEFAULT_TRANSFORMER)
+        # Load the Whisper Transformer object.
+        tokenizer = _get_processor(DEFAULT_TRANSFORMER)
 
-            # Extract tokens from result
-            tokens = res[0][0].numpy()  # type: ignore
+        # Extract tokens from result
+        tokens = res[0][0].numpy()  # type: ignore
 
-            # Use transform to decode tokens
-            text = tokenizer.batch_decode(tokens, skip_special_tokens=True).pop()
+        # Use transform to decode tokens
+        text = tokenizer.batch_decode(tokens, skip_special_tokens=True).pop()
 
-            return text
+        return text
@@ -19,6 +19,8 @@ from .utils import *
 
 from dataclasses import dataclass
 from enum import IntEnum
+from functools import lru_cache
+from itertools import islice, zip_longest
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 import os
@@ -62,23 +64,31 @@ class ModelDatumType(IntEnum):
     Bool = 10
 
 
+# Wire format of the tensors, as numpy dtypes so that the format strings are
+# parsed once instead of on every (de)serialization.
 format_per_item = {
-    ModelDatumType.F32: "<f4",
-    ModelDatumType.F64: "<f8",
-    ModelDatumType.I32: "<i4",
-    ModelDatumType.I64: "<i8",
-    ModelDatumType.U32: "<u4",
-    ModelDatumType.U64: "<u8",
-    ModelDatumType.U8: "<u1",
-    ModelDatumType.U16: "<u2",
-    ModelDatumType.I8: "<i1",
-    ModelDatumType.I16: "<i2",
-    ModelDatumType.Bool: "?",
+    ModelDatumType.F32: np.dtype("<f4"),
+    ModelDatumType.F64: np.dtype("<f8"),
+    ModelDatumType.I32: np.dtype("<i4"),
+    ModelDatumType.I64: np.dtype("<i8"),
+    ModelDatumType.U32: np.dtype("<u4"),
+    ModelDatumType.U64: np.dtype("<u8"),
+    ModelDatumType.U8: np.dtype("<u1"),
+    ModelDatumType.U16: np.dtype("<u2"),
+    ModelDatumType.I8: np.dtype("<i1"),
+    ModelDatumType.I16: np.dtype("<i2"),
+    ModelDatumType.Bool: np.dtype("?"),
 }
 
 
 def serialize_tensor(tensor: np.ndarray, type: ModelDatumType) -> bytes:
-    return np.array(tensor).astype(format_per_item[type], casting="equiv").tobytes()
+    # asarray and astype(copy=False) are no-ops when the tensor already has the
+    # wire format, so the only copy made is the final contiguous tobytes()
+    return (
+        np.asarray(tensor)
+        .astype(format_per_item[type], casting="equiv", copy=False)
+        .tobytes()
+    )
 
 
 def deserialize_tensor(data: bytes, type: ModelDatumType) -> np.ndarray:
@@ -116,9 +126,12 @@ class Tensor:
         return self.as_numpy().tolist()
 
     def as_numpy(self):
-        """Convert the prediction calculated by the server to a numpy array."""
+        """Convert the prediction calculated by the server to a numpy array.
+
+        The array is a read-only view over the received bytes, no copy is made.
+        """
 
-        arr = deserialize_tensor(self.bytes_data, self.info.datum_type)
+        arr = deserialize_tensor(self.bytes_data, self.datum_type)
         arr.shape = self.shape
         return arr
 
@@ -154,7 +167,7 @@ class Tensor:
 
 @dataclass
 class UploadModel:
-    model: List[int]
+    model: bytes
     length: int
     model_name: str
     optimize: bool
@@ -269,28 +282,131 @@ class _ClientInfo:
         }
 
 
+class _EncodedCBOR:
+    """A value that has already been CBOR-encoded.
+
+    It is written verbatim into the enclosing document by `_write_encoded_cbor`,
+    which lets values that are identical across requests be encoded only once.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def _write_encoded_cbor(encoder: cbor.CBOREncoder, value: Any):
+    if not isinstance(value, _EncodedCBOR):
+        raise cbor.CBOREncodeError(
+            f"cannot serialize type {type(value).__module__}.{type(value).__name__}"
+        )
+    encoder.write(value.data)
+
+
+@lru_cache(maxsize=None)
+def _client_info() -> _ClientInfo:
+    """Collect the client information sent along with every request.
+
+    It only depends on the host and the process, so it is computed once and
+    shared by all connections.
+    """
+    uname = platform.uname()
+
+    return _ClientInfo(
+        uid=sha256((socket.gethostname() + "-" + getpass.getuser()).encode("utf-8"))
+        .digest()
+        .hex(),
+        platform_name=uname.system,
+        platform_arch=uname.machine,
+        platform_version=uname.version,
+        platform_release=uname.release,
+        user_agent="blindai_python",
+        user_agent_version=app_version,
+        is_colab="google.colab" in sys.modules,
+    )
+
+
+numpy_type_per_item = {
+    ModelDatumType.F32: "float32",
+    ModelDatumType.F64: "float64",
+    ModelDatumType.I32: "int32",
+    ModelDatumType.I64: "int64",
+    ModelDatumType.U32: "uint32",
+    ModelDatumType.U64: "uint64",
+    ModelDatumType.U8: "uint8",
+    ModelDatumType.U16: "uint16",
+    ModelDatumType.I8: "int8",
+    ModelDatumType.I16: "int16",
+    ModelDatumType.Bool: "bool",
+}
+
+# Torch does not support unsigned ints except u8.
+torch_type_per_item = {
+    ModelDatumType.F32: "float32",
+    ModelDatumType.F64: "float64",
+    ModelDatumType.I32: "int32",
+    ModelDatumType.I64: "int64",
+    ModelDatumType.U8: "uint8",
+    ModelDatumType.I8: "int8",
+    ModelDatumType.I16: "int16",
+    ModelDatumType.Bool: "bool",
+}
+
+# Reverse mappings used by translate_dtype, built once rather than on every call.
+# Numpy dtypes are looked up directly, np.dtype instances are hashable.
+_numpy_dtype_translation = {
+    np.dtype(numpy_type): datum_type
+    for datum_type, numpy_type in numpy_type_per_item.items()
+}
+
+
+_str_dtype_translation = {
+    "float32": ModelDatumType.F32,
+    "f32": ModelDatumType.F32,
+    "float64": ModelDatumType.F64,
+    "f64": ModelDatumType.F64,
+    "int32": ModelDatumType.I32,
+    "i32": ModelDatumType.I32,
+    "int64": ModelDatumType.I64,
+    "i64": ModelDatumType.I64,
+    "uint32": ModelDatumType.U32,
+    "u32": ModelDatumType.U32,
+    "uint64": ModelDatumType.U64,
+    "u64": ModelDatumType.U64,
+    "uint8": ModelDatumType.U8,
+    "u8": ModelDatumType.U8,
+    "uint16": ModelDatumType.U16,
+    "u16": ModelDatumType.U16,
+    "int8": ModelDatumType.I8,
+    "i8": ModelDatumType.I8,
+    "int16": ModelDatumType.I16,
+    "i16": ModelDatumType.I16,
+    "bool": ModelDatumType.Bool,
+}
+
+
+@lru_cache(maxsize=None)
+def _torch_dtype_translation() -> Dict[Any, ModelDatumType]:
+    """Build the torch.dtype to ModelDatumType table.
+
+    torch is an optional dependency, so the table is only built the first time a
+    torch dtype has to be translated.
+    """
+    import torch
+
+    return {
+        getattr(torch, torch_type): datum_type
+        for datum_type, torch_type in torch_type_per_item.items()
+    }
+
+
 def dtype_to_numpy(dtype: ModelDatumType) -> str:
     """Convert a ModelDatumType to a numpy type.
 
     Raises:
         ValueError: if numpy doesn't support dtype
     """
-    translation_map = {
-        ModelDatumType.F32: "float32",
-        ModelDatumType.F64: "float64",
-        ModelDatumType.I32: "int32",
-        ModelDatumType.I64: "int64",
-        ModelDatumType.U32: "uint32",
-        ModelDatumType.U64: "uint64",
-        ModelDatumType.U8: "uint8",
-        ModelDatumType.U16: "uint16",
-        ModelDatumType.I8: "int8",
-        ModelDatumType.I16: "int16",
-        ModelDatumType.Bool: "bool",
-    }
-    if dtype not in translation_map:
+    if dtype not in numpy_type_per_item:
         raise ValueError(f"Numpy does not support datum type {dtype}.")
-    return translation_map[dtype]
+    return numpy_type_per_item[dtype]
 
 
 def dtype_to_torch(dtype: ModelDatumType) -> str:
@@ -299,20 +415,9 @@ def dtype_to_torch(dtype: ModelDatumType) -> str:
     Raises:
         ValueError: if torch doesn't support dtype
     """
-    # Torch does not support unsigned ints except u8.
-    translation_map = {
-        ModelDatumType.F32: "float32",
-        ModelDatumType.F64: "float64",
-        ModelDatumType.I32: "int32",
-        ModelDatumType.I64: "int64",
-        ModelDatumType.U8: "uint8",
-        ModelDatumType.I8: "int8",
-        ModelDatumType.I16: "int16",
-        ModelDatumType.Bool: "bool",
-    }
-    if dtype not in translation_map:
+    if dtype not in torch_type_per_item:
         raise ValueError(f"Torch does not support datum type {dtype}.")
-    return translation_map[dtype]
+    return torch_type_per_item[dtype]
 
 
 def translate_dtype(dtype: Any) -> ModelDatumType:
@@ -325,67 +430,22 @@ def translate_dtype(dtype: Any) -> ModelDatumType:
     if isinstance(dtype, ModelDatumType):
         return dtype
 
-    elif type(dtype).__module__ == "numpy" and type(dtype).__name__.startswith("dtype"):
-        numpy_dtype_translation = {
-            "float32": ModelDatumType.F32,
-            "float64": ModelDatumType.F64,
-            "int32": ModelDatumType.I32,
-            "int64": ModelDatumType.I64,
-            "uint32": ModelDatumType.U32,
-            "uint64": ModelDatumType.U64,
-            "uint8": ModelDatumType.U8,
-            "uint16": ModelDatumType.U16,
-            "int8": ModelDatumType.I8,
-            "int16": ModelDatumType.I16,
-            "bool": ModelDatumType.Bool,
-        }
-        if str(dtype) not in numpy_dtype_translation:
+    elif isinstance(dtype, np.dtype):
+        if dtype not in _numpy_dtype_translation:
             raise ValueError(f"Numpy dtype {str(dtype)} is not supported.")
-        return numpy_dtype_translation[str(dtype)]
-
-    if type(dtype).__module__ == "torch" and type(dtype).__name__ == "dtype":
-        # Torch does not support unsigned ints except u8.
-        torch_dtype_translation = {
-            "torch.float32": ModelDatumType.F32,
-            "torch.float64": ModelDatumType.F64,
-            "torch.int32": ModelDatumType.I32,
-            "torch.int64": ModelDatumType.I64,
-            "torch.uint8": ModelDatumType.U8,
-            "torch.int8": ModelDatumType.I8,
-            "torch.int16": ModelDatumType.I16,
-            "torch.bool": ModelDatumType.Bool,
-        }
-        if str(dtype) not in torch_dtype_translation:
+        return _numpy_dtype_translation[dtype]
+
+    torch = sys.modules.get("torch")
+    if torch is not None and isinstance(dtype, torch.dtype):
+        torch_dtype_translation = _torch_dtype_translation()
+        if dtype not in torch_dtype_translation:
             raise ValueError(f"Torch dtype {str(dtype)} is not supported.")
-        return torch_dtype_translation[str(dtype)]
+        return torch_dtype_translation[dtype]
 
     if isinstance(dtype, str):
-        str_dtype_translation = {
-            "float32": ModelDatumType.F32,
-            "f32": ModelDatumType.F32,
-            "float64": ModelDatumType.F64,
-            "f64": ModelDatumType.F64,
-            "int32": ModelDatumType.I32,
-            "i32": ModelDatumType.I32,
-            "int64": ModelDatumType.I64,
-            "i64": ModelDatumType.I64,
-            "uint32": ModelDatumType.U32,
-            "u32": ModelDatumType.U32,
-            "uint64": ModelDatumType.U64,
-            "u64": ModelDatumType.U64,
-            "uint8": ModelDatumType.U8,
-            "u8": ModelDatumType.U8,
-            "uint16": ModelDatumType.U16,
-            "u16": ModelDatumType.U16,
-            "int8": ModelDatumType.I8,
-            "i8": ModelDatumType.I8,
-            "int16": ModelDatumType.I16,
-            "i16": ModelDatumType.I16,
-            "bool": ModelDatumType.Bool,
-        }
-        if dtype.lower() not in str_dtype_translation:
+        if dtype.lower() not in _str_dtype_translation:
             raise ValueError(f"Datum type {dtype} is not understood.")
-        return str_dtype_translation[dtype.lower()]
+        return _str_dtype_translation[dtype.lower()]
 
     raise ValueError(
         f"DatumType instance {type(dtype).__module__}.{type(dtype).__name__} not supported"
@@ -393,11 +453,14 @@ def translate_dtype(dtype: Any) -> ModelDatumType:
 
 
 def _is_torch_tensor(tensor) -> bool:
-    return type(tensor).__module__ == "torch" and type(tensor).__name__ == "Tensor"
+    # A torch tensor cannot exist unless torch has been imported, so there is no
+    # need to import it here (torch is an optional dependency)
+    torch = sys.modules.get("torch")
+    return torch is not None and isinstance(tensor, torch.Tensor)
 
 
 def _is_numpy_array(tensor) -> bool:
-    return type(tensor).__module__ == "numpy" and type(tensor).__name__ == "ndarray"
+    return isinstance(tensor, np.ndarray)
 
 
 def translate_tensor(
@@ -415,13 +478,19 @@ def translate_tensor(
     Returns:
         Tensor: the serialized tensor
     """
+    # or_dtype may be a string, a numpy or a torch dtype, translate it once
+    expected_dtype = translate_dtype(or_dtype) if or_dtype is not None else None
+
     if _is_torch_tensor(tensor):
-        info = TensorInfo(tensor.shape, translate_dtype(tensor.dtype), name)
-        iterable = tensor.flatten().numpy()
+        info = TensorInfo(tuple(tensor.shape), translate_dtype(tensor.dtype), name)
+        # numpy() shares memory with CPU tensors, detach() and cpu() are no-ops unless
+        # the tensor requires grad or lives on another device
+        iterable = tensor.detach().cpu().numpy()
 
     elif _is_numpy_array(tensor):
         info = TensorInfo(tensor.shape, translate_dtype(tensor.dtype), name)
-        iterable = tensor.flatten()
+        # tobytes() in serialize_tensor already flattens in C order, no need to copy here
+        iterable = tensor
 
     else:
         # Input is flatten tensor.
@@ -430,12 +499,30 @@ def translate_tensor(
                 f"Input tensor has an unsupported type: {type(tensor).__module__}.{type(tensor).__name__}"
             )
 
-        info = TensorInfo(or_shape, translate_dtype(or_dtype), name)
-        iterable = np.array(tensor, dtype=dtype_to_numpy(or_dtype))
+        if expected_dtype is None:
+            raise ValueError("The dtype of a flat tensor must be provided.")
 
-    if or_dtype is not None and or_dtype != info.datum_type:
+        # The shape must be made of plain ints to be CBOR-encodable (e.g. not numpy ints)
+        shape: Optional[Tuple[int, ...]]
+        if or_shape is None:
+            shape = None
+        elif isinstance(or_shape, (int, np.integer)):
+            # a bare int is the shape of a 1-D tensor, e.g. shapes=[4]
+            shape = (int(or_shape),)
+        else:
+            try:
+                shape = tuple(map(int, or_shape))
+            except TypeError:
+                raise ValueError(
+                    "shape of a flat tensor must be a sequence of ints"
+                ) from None
+        info = TensorInfo(shape, expected_dtype, name)
+        # cast straight to the wire format so serialize_tensor has nothing left to convert
+        iterable = np.asarray(tensor, dtype=format_per_item[info.datum_type])
+
+    if expected_dtype is not None and expected_dtype != info.datum_type:
         raise ValueError(
-            f"Given tensor has dtype {str(tensor.dtype)}, but {or_dtype} was expected."
+            f"Given tensor has dtype {info.datum_type.name}, but {expected_dtype.name} was expected."
         )
 
     # todo validate tensor content, dtype and shape
@@ -493,9 +580,11 @@ def translate_tensors(tensors, dtypes, shapes) -> List[dict]:
         if shapes is not None and not isinstance(shapes, list):
             shapes = [shapes]
 
-        for i, tensor in enumerate(tensors):
-            or_dtype = dtypes[i] if dtypes is not None and len(dtypes) > i else None
-            or_shape = shapes[i] if shapes is not None and len(shapes) > i else None
+        # dtypes and shapes may be missing or shorter than tensors (None is used
+        # instead), extra entries are ignored
+        for tensor, or_dtype, or_shape in islice(
+            zip_longest(tensors, dtypes or [], shapes or []), len(tensors)
+        ):
             serialized_tensors.append(
                 translate_tensor(tensor, or_dtype, or_shape).__dict__
             )
@@ -544,20 +633,9 @@ class BlindAiConnection(contextlib.AbstractContextManager):
                 SimulationModeWarning,
             )
 
-        uname = platform.uname()
-
-        self.client_info = _ClientInfo(
-            uid=sha256((socket.gethostname() + "-" + getpass.getuser()).encode("utf-8"))
-            .digest()
-            .hex(),
-            platform_name=uname.system,
-            platform_arch=uname.machine,
-            platform_version=uname.version,
-            platform_release=uname.release,
-            user_agent="blindai_python",
-            user_agent_version=app_version,
-            is_colab="google.colab" in sys.modules,
-        )
+        self.client_info = _client_info()
+        # client_info is sent along every request, encode it once per connection
+        self._client_info_cbor = _EncodedCBOR(cbor.dumps(self.client_info.__dict__))
 
         if hazmat_http_on_unattested_port:
             self._unattested_url = f"http://{addr}:{unattested_server_port}"
@@ -580,38 +658,41 @@ class BlindAiConnection(contextlib.AbstractContextManager):
                     conn, url, verify, cert
                 )
 
-        s = requests.Session()
-        # Always raise an exception when HTTP returns an error code for the unattested connection
-        # Note : we might want to do the same for the attested connection ?
-        s.hooks = {"response": lambda r, *args, **kwargs: r.raise_for_status()}
-        req = s.get(self._unattested_url)
-        cert = cbor.loads(req.content)
-        if not simulation_mode and "mock" in req.headers["Server"]:
-            raise AttestationError(
-                "The BlindAI server is a mock. You can only connect to it in simulation mode."
-            )
-
-        if not simulation_mode:
-            try:
-                quote = cbor.loads(s.get(f"{self._unattested_url}/quote").content)
-                collateral = cbor.loads(
-                    s.get(f"{self._unattested_url}/collateral").content
+        # The unattested session is only needed for the attestation, it is closed right after
+        with requests.Session() as s:
+            # Always raise an exception when HTTP returns an error code for the unattested connection
+            # Note : we might want to do the same for the attested connection ?
+            s.hooks = {"response": lambda r, *args, **kwargs: r.raise_for_status()}
+            req = s.get(self._unattested_url)
+            cert = cbor.loads(req.content)
+            if not simulation_mode and "mock" in req.headers["Server"]:
+                raise AttestationError(
+                    "The BlindAI server is a mock. You can only connect to it in simulation mode."
                 )
+
+            if not simulation_mode:
                 try:
-                    collateral = Collateral(**collateral)
-                except TypeError as e:
-                    raise AttestationError("Bad attestation collateral from the server")
-
-                validate_attestation(
-                    quote,
-                    collateral,
-                    cert,
-                    manifest_path=hazmat_manifest_path,
-                )
-            except AttestationError as e:
-                raise
-            except Exception as e:
-                raise AttestationError("Attestation verification failed")
+                    quote = cbor.loads(s.get(f"{self._unattested_url}/quote").content)
+                    collateral = cbor.loads(
+                        s.get(f"{self._unattested_url}/collateral").content
+                    )
+                    try:
+                        collateral = Collateral(**collateral)
+                    except TypeError as e:
+                        raise AttestationError(
+                            "Bad attestation collateral from the server"
+                        )
+
+                    validate_attestation(
+                        quote,
+                        collateral,
+                        cert,
+                        manifest_path=hazmat_manifest_path,
+                    )
+                except AttestationError as e:
+                    raise
+                except Exception as e:
+                    raise AttestationError("Attestation verification failed")
 
         # requests (http library) takes a path to a file containing the CA
         # there is no easy way to give the CA as a string/bytes directly
@@ -672,14 +753,16 @@ class BlindAiConnection(contextlib.AbstractContextManager):
 
         length = len(model_bytes)
 
+        # Sent as a CBOR byte string (the server field is serde_bytes), which avoids
+        # boxing every byte of the model into a Python int and a CBOR integer
         data = UploadModel(
-            model=list(model_bytes),
+            model=model_bytes,
             length=length,
             model_name=model_name,
             optimize=optimize,
-            client_info=self.client_info.__dict__,
+            client_info=self._client_info_cbor,
         )
-        bytes_data = cbor.dumps(data.__dict__)
+        bytes_data = cbor.dumps(data.__dict__, default=_write_encoded_cbor)
         r = self._conn.post(f"{self._model_management_url}/upload", data=bytes_data)
         r.raise_for_status()
         send_model_reply = SendModelReply(**cbor.loads(r.content))
@@ -738,9 +821,9 @@ class BlindAiConnection(contextlib.AbstractContextManager):
             model_hash=model_hash,
             model_id=model_id,
             inputs=tensors,
-            client_info=self.client_info.__dict__,
+            client_info=self._client_info_cbor,
         )
-        bytes_run_data = cbor.dumps(run_data.__dict__)
+        bytes_run_data = cbor.dumps(run_data.__dict__, default=_write_encoded_cbor)
         r = self._conn.post(f"{self._attested_url}/run", data=bytes_run_data)
         r.raise_for_status()
         run_model_reply = RunModelReply(**cbor.loads(r.content))
@@ -778,6 +861,8 @@ class BlindAiConnection(contextlib.AbstractContextManager):
 
     def close(self):
         self._conn.close()
+        # Removes the temporary file holding the attested server certificate
+        self.attested_cert_file.close()
 
     def __enter__(self):
         """Return the BlindAiConnection upon entering the runtime context."""
@@ -0,0 +1,112 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+import torch
+
+from blindai import audio
+from blindai.audio import Audio
+
+
+class FakeConnection:
+    """Connection whose run_model fails with the queued errors, then succeeds."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        self.run_model_calls = 0
+        self.closed = False
+
+    def run_model(self, model_hash, input_tensors):
+        self.run_model_calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(
+            output=[SimpleNamespace(as_torch=lambda: torch.tensor([[[1, 2]]]))]
+        )
+
+    def close(self):
+        self.closed = True
+
+
+class FakeProcessor:
+    def batch_decode(self, tokens, skip_special_tokens):
+        return ["transcription"]
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Replace connect, the audio preprocessing and the processor, record the connections."""
+    created = []
+    errors = []
+
+    def connect(*args, **kwargs):
+        # widen the window in which concurrent first calls could both connect
+        time.sleep(0.01)
+        conn = FakeConnection(errors)
+        created.append(conn)
+        return conn
+
+    monkeypatch.setattr(audio, "connect", connect)
+    monkeypatch.setattr(audio, "_preprocess_audio", lambda file: torch.zeros(1))
+    monkeypatch.setattr(audio, "_get_processor", lambda transformer: FakeProcessor())
+    monkeypatch.setattr(audio, "_default_connection", None)
+    return created, errors
+
+
+def testDefaultConnectionCreatedOnce(connections):
+    created, _ = connections
+
+    threads = [
+        threading.Thread(target=audio._get_connection, args=(None, "sgx"))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert Audio.transcribe(b"audio") == "transcription"
+    assert Audio.transcribe(b"audio") == "transcription"
+    assert len(created) == 1
+
+
+def testConnectionErrorReconnectsOnce(connections):
+    created, errors = connections
+    errors.append(requests.exceptions.SSLError())
+
+    assert Audio.transcribe(b"audio") == "transcription"
+    assert len(created) == 2
+    assert created[0].closed
+    assert audio._default_connection is created[1]
+
+
+def testConnectionErrorRaisedAfterRetry(connections):
+    created, errors = connections
+    errors.extend([requests.exceptions.ConnectionError()] * 2)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        Audio.transcribe(b"audio")
+    assert len(created) == 2
+
+
+def testHTTPErrorNotRetried(connections):
+    created, errors = connections
+    errors.append(requests.exceptions.HTTPError())
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        Audio.transcribe(b"audio")
+    assert len(created) == 1
+    assert created[0].run_model_calls == 1
+    assert not created[0].closed
+
+
+def testCallerConnectionNotRetried(connections):
+    created, errors = connections
+    conn = FakeConnection([requests.exceptions.ConnectionError()])
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        Audio.transcribe(b"audio", connection=conn)
+    assert created == []
+    assert not conn.closed
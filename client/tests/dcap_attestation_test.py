@@ -0,0 +1,83 @@
+from dataclasses import replace
+
+import pytest
+
+from blindai import _dcap_attestation
+from blindai._dcap_attestation import Collateral, QUOTE_VERIFICATION_CACHE_TTL
+
+COLLATERAL = Collateral(
+    version=3,
+    pck_certificate="pck_certificate",
+    pck_crl_issuer_chain="pck_crl_issuer_chain",
+    pck_signing_chain="pck_signing_chain",
+    root_ca_crl="root_ca_crl",
+    pck_crl="pck_crl",
+    tcb_info="tcb_info",
+    tcb_info_issuer_chain="tcb_info_issuer_chain",
+    qe_identity="qe_identity",
+    qe_identity_issuer_chain="qe_identity_issuer_chain",
+)
+
+
+@pytest.fixture
+def verifier(monkeypatch):
+    """Replace the quote verification library and the clock, count the verifications."""
+    calls = []
+    clock = {"now": 1000.0}
+
+    def verify(**kwargs):
+        calls.append(kwargs)
+        return object()
+
+    monkeypatch.setattr(_dcap_attestation.sgx_dcap_quote_verify, "verify", verify)
+    monkeypatch.setattr(_dcap_attestation.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(_dcap_attestation, "_quote_verification_cache", {})
+    return calls, clock
+
+
+def testVerifyQuoteCachedWithinTTL(verifier):
+    calls, clock = verifier
+
+    result = _dcap_attestation._verify_quote(b"quote", COLLATERAL)
+    clock["now"] += QUOTE_VERIFICATION_CACHE_TTL - 1
+
+    assert _dcap_attestation._verify_quote(b"quote", COLLATERAL) is result
+    assert len(calls) == 1
+
+
+def testVerifyQuoteExpiredAfterTTL(verifier):
+    calls, clock = verifier
+
+    result = _dcap_attestation._verify_quote(b"quote", COLLATERAL)
+    clock["now"] += QUOTE_VERIFICATION_CACHE_TTL
+
+    assert _dcap_attestation._verify_quote(b"quote", COLLATERAL) is not result
+    assert len(calls) == 2
+    # the stale entry was replaced, not kept next to the fresh one
+    cache = _dcap_attestation._quote_verification_cache
+    assert len(cache) == 1
+    assert cache[(b"quote", tuple(vars(COLLATERAL).values()))][0] == clock["now"]
+
+
+def testVerifyQuoteStaleEntriesPruned(verifier):
+    calls, clock = verifier
+
+    _dcap_attestation._verify_quote(b"quote", COLLATERAL)
+    clock["now"] += QUOTE_VERIFICATION_CACHE_TTL
+    _dcap_attestation._verify_quote(b"other quote", COLLATERAL)
+
+    assert len(calls) == 2
+    assert [key[0] for key in _dcap_attestation._quote_verification_cache] == [
+        b"other quote"
+    ]
+
+
+def testVerifyQuoteDifferentCollateral(verifier):
+    calls, _ = verifier
+
+    _dcap_attestation._verify_quote(b"quote", COLLATERAL)
+    _dcap_attestation._verify_quote(
+        b"quote", replace(COLLATERAL, tcb_info="other tcb_info")
+    )
+
+    assert len(calls) == 2
@@ -1,5 +1,6 @@
 from blindai.client import *
 import numpy
+import pytest
 import torch
 
 
@@ -20,20 +21,35 @@ def testTensorDeserialization():
         assert torch_results
 
 
+def testTensorAsFlat():
+    serialized = {
+        "info": {"fact": [2, 2], "datum_type": "I64", "node_name": "output"},
+        "bytes_data": b"\x01\x00\x00\x00\x00\x00\x00\x00\x02\x00\x00\x00\x00\x00\x00\x00\x03\x00\x00\x00\x00\x00\x00\x00\x04\x00\x00\x00\x00\x00\x00\x00",
+    }
+    tensor = Tensor(TensorInfo(**serialized["info"]), serialized["bytes_data"])
+
+    assert tensor.as_flat() == [[1, 2], [3, 4]]
+    assert tensor.as_flat()[0][1] == 2
+
+
 def testTensorSerialization():
     expected_bytes = b"\x01\x00\x00\x00\x00\x00\x00\x00\x02\x00\x00\x00\x00\x00\x00\x00\x03\x00\x00\x00\x00\x00\x00\x00\x04\x00\x00\x00\x00\x00\x00\x00"
 
     tensor1 = [1, 2, 3, 4]
     o = translate_tensors(tensor1, ModelDatumType.I64, (4,))
     assert o[0]["bytes_data"] == expected_bytes
+    assert translate_tensors(tensor1, "i64", (4,)) == o
+    assert translate_tensors(tensor1, numpy.dtype("int64"), (4,)) == o
+    assert translate_tensors(tensor1, ModelDatumType.I64, (numpy.int64(4),)) == o
+    assert translate_tensors(tensor1, ModelDatumType.I64, [4]) == o
+    with pytest.raises(ValueError):
+        translate_tensors(tensor1, ModelDatumType.I64, 4.0)
     assert o[0]["info"] == {
         "fact": (4,),
         "datum_type": ModelDatumType.I64,
         "node_name": None,
     }
 
-    import numpy
-
     tensor2 = numpy.array([1, 2, 3, 4])
     o = translate_tensors(tensor2, None, None)
     assert o[0]["bytes_data"] == expected_bytes